@@ -1,15 +1,218 @@
 #!/usr/bin/env python3
 # mcp_server.py
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+import asyncio
+import signal
 import subprocess
+import sys
 import json
 import os
 import time
+import uuid
+import hashlib
+import keyword
+import math
+import re
+import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional, Any, Union
 
+try:
+    import resource
+except ImportError:
+    # rlimits are not available on Windows
+    resource = None
+
 # Create an MCP server
 mcp = FastMCP("Jupyter Lab MCP Server")
 
+# Notebook outputs larger than this (in bytes) are moved into the blob store
+BLOB_MIN_SIZE = 16 * 1024
+# Name of the content-addressed blob directory created next to notebooks
+BLOB_DIR_NAME = ".nbblobs"
+# Prefix of the reference stubs left behind in compacted notebooks
+BLOB_REF_PREFIX = "nbblob:sha256:"
+# Valid blob digests (SHA-256, lowercase hex)
+BLOB_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+# Default location of kernel checkpoints
+CHECKPOINT_DIR = os.path.expanduser("~/.jupyter_mcp/checkpoints")
+# Marks the line of kernel output carrying the JSON result of a helper
+KERNEL_RESULT_MARKER = "__MCP_RESULT__"
+# Maximum number of cell executions running at once
+EXECUTION_MAX_RUNNING = int(os.environ.get("EXECUTION_MAX_RUNNING", 0)) or os.cpu_count() or 1
+# Maximum number of executions waiting for a slot before new ones are rejected
+EXECUTION_MAX_QUEUED = int(os.environ.get("EXECUTION_MAX_QUEUED", 0)) or 64
+# Seconds an execution may wait in the queue / run before it is abandoned. These
+# are the defaults and also the most a caller may request.
+EXECUTION_QUEUE_TIMEOUT = float(os.environ.get("EXECUTION_QUEUE_TIMEOUT", 0)) or 300
+EXECUTION_RUN_TIMEOUT = float(os.environ.get("EXECUTION_RUN_TIMEOUT", 0)) or 600
+# Address space limit per execution in MB, and the most a caller may request
+# (None for no limit)
+EXECUTION_MEMORY_LIMIT_MB = int(os.environ.get("EXECUTION_MEMORY_LIMIT_MB", 0)) or None
+
+
+class SchedulerError(Exception):
+    """Raised when an execution is rejected or times out in the queue."""
+
+
+class ExecutionScheduler:
+    """
+    Bounded run queue for executions with priority levels and per-client fair sharing.
+    
+    Waiting executions are admitted from the highest priority level first. Within a
+    level, clients take turns, so one client submitting many executions cannot
+    starve the others. Executions are rejected as soon as the queue is full.
+    """
+
+    PRIORITIES = ("high", "normal", "low")
+
+    def __init__(self, max_running: int, max_queued: int):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # priority -> client id -> waiting entries, in round-robin order
+        self._queues = {priority: OrderedDict() for priority in self.PRIORITIES}
+        self._wait_times = deque(maxlen=1000)
+
+    async def run(self, func, client_id: str = "default", priority: str = "normal",
+                  queue_timeout: Optional[float] = None) -> Any:
+        """
+        Wait for a slot, then await func() and return its result.
+        """
+        if priority not in self._queues:
+            raise SchedulerError(f"Unknown priority '{priority}', expected one of {', '.join(self.PRIORITIES)}")
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerError(f"Execution queue is full ({self.queued} waiting)")
+
+        admitted = asyncio.get_running_loop().create_future()
+        entry = (admitted, time.monotonic())
+        self._queues[priority].setdefault(client_id, deque()).append(entry)
+        self.queued += 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(admitted), queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not admitted.done():
+                self._remove(priority, client_id, entry)
+                admitted.cancel()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timed_out += 1
+                    raise SchedulerError(f"Execution waited more than {queue_timeout}s in the queue")
+                raise
+            if isinstance(e, asyncio.CancelledError):
+                # Admitted just as the caller went away, so give the slot back
+                self._release()
+                raise
+
+        try:
+            return await func()
+        finally:
+            self.completed += 1
+            self._release()
+
+    def stats(self) -> Dict:
+        """
+        Return queue depth, utilization and wait-time metrics.
+        """
+        waits = sorted(self._wait_times)
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "queued_by_priority": {
+                priority: sum(len(entries) for entries in clients.values())
+                for priority, clients in self._queues.items()
+            },
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_time_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_time_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "wait_time_max": round(waits[-1], 3) if waits else 0.0
+        }
+
+    def _release(self) -> None:
+        self.running -= 1
+        self._dispatch()
+
+    def _remove(self, priority: str, client_id: str, entry: tuple) -> None:
+        clients = self._queues[priority]
+        entries = clients.get(client_id)
+        if entries and entry in entries:
+            entries.remove(entry)
+            self.queued -= 1
+            if not entries:
+                del clients[client_id]
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_running:
+            entry = self._next_entry()
+            if entry is None:
+                return
+            admitted, enqueued_at = entry
+            self.running += 1
+            self._wait_times.append(time.monotonic() - enqueued_at)
+            admitted.set_result(None)
+
+    def _next_entry(self) -> Optional[tuple]:
+        for clients in self._queues.values():
+            if not clients:
+                continue
+            # Take from the client at the front, then send it to the back of the line
+            client_id, entries = next(iter(clients.items()))
+            entry = entries.popleft()
+            self.queued -= 1
+            if entries:
+                clients.move_to_end(client_id)
+            else:
+                del clients[client_id]
+            return entry
+        return None
+
+
+scheduler = ExecutionScheduler(EXECUTION_MAX_RUNNING, EXECUTION_MAX_QUEUED)
+
+
+def _parse_limit(value: Any, name: str, default: Optional[float], maximum: Optional[float]) -> Optional[float]:
+    """
+    Validate a caller-supplied limit and clamp it to the server maximum.
+    
+    Returns:
+        float: The limit, or the default when value is None
+    
+    Raises:
+        ValueError: If the value is not a positive finite number
+    """
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{name} must be a positive number")
+    return min(value, maximum) if maximum else value
+
+
+def _execution_limits(cpu_seconds: Optional[int], memory_limit_mb: Optional[int]):
+    """
+    Return a preexec_fn applying CPU and memory rlimits to a child process.
+    """
+    # resource is imported at module level: importing in a forked child of a
+    # threaded process can deadlock on the import lock
+    def apply_limits():
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        if memory_limit_mb:
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return apply_limits if resource is not None else None
+
 
 @mcp.tool()
 async def list_notebooks(path: Optional[str] = None) -> Dict:
@@ -36,50 +239,110 @@ async def list_notebooks(path: Optional[str] = None) -> Dict:
 
 
 @mcp.tool()
-async def execute_cell(notebook_path: str, cell_content: str) -> Dict:
+async def execute_cell(
+    notebook_path: str,
+    cell_content: str,
+    client_id: str = "default",
+    priority: str = "normal",
+    queue_timeout: Optional[float] = None,
+    run_timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None
+) -> Dict:
     """
     Execute a cell in a Jupyter notebook.
     
+    Executions go through a bounded run queue shared by all clients. Requests are
+    rejected immediately when the queue is full.
+    
     Args:
         notebook_path (str): Path to the notebook
         cell_content (str): Content of the cell to execute
+        client_id (str, optional): Identifies the caller for fair sharing. Defaults to "default".
+        priority (str, optional): "high", "normal" or "low". Defaults to "normal".
+        queue_timeout (float, optional): Seconds to wait for a free slot.
+            Defaults to, and is capped at, EXECUTION_QUEUE_TIMEOUT (300).
+        run_timeout (float, optional): Seconds the execution may run, also used as the
+            CPU time limit. Defaults to, and is capped at, EXECUTION_RUN_TIMEOUT (600).
+        memory_limit_mb (int, optional): Address space limit in MB. Defaults to, and is
+            capped at, EXECUTION_MEMORY_LIMIT_MB (no limit unless configured).
         
     Returns:
         Dict: Output from cell execution
     """
-    try:
+    async def run() -> Dict:
         # Create a temporary Python script with the cell content
-        temp_script = f"/tmp/jupyter_cell_{os.getpid()}.py"
-        with open(temp_script, "w") as f:
-            f.write(cell_content)
-        
-        # Execute the script using jupyter nbconvert
-        cmd = [
-            "jupyter", "nbconvert", 
-            "--to", "notebook", 
-            "--execute", temp_script,
-            "--stdout"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Clean up
-        if os.path.exists(temp_script):
-            os.remove(temp_script)
-            
-        if result.returncode == 0:
+        fd, temp_script = tempfile.mkstemp(prefix="jupyter_cell_", suffix=".py")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(cell_content)
+
+            # Execute the script using jupyter nbconvert
+            cmd = [
+                "jupyter", "nbconvert",
+                "--to", "notebook",
+                "--execute", temp_script,
+                "--stdout"
+            ]
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=_execution_limits(math.ceil(run_timeout), memory_limit_mb),
+                start_new_session=True
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), run_timeout)
+            except asyncio.TimeoutError:
+                # Kill the whole process group so the kernel started by nbconvert goes too
+                _kill_process_group(process)
+                await process.wait()
+                return {
+                    "error": f"Execution exceeded {run_timeout}s"
+                }
+            except BaseException:
+                # Cancelled: free the slot only once nothing is left running
+                _kill_process_group(process)
+                raise
+        finally:
+            # Clean up
+            if os.path.exists(temp_script):
+                os.remove(temp_script)
+
+        if process.returncode == 0:
             return {
-                "output": result.stdout
+                "output": stdout.decode(errors="replace")
             }
         else:
             return {
-                "error": result.stderr
+                "error": stderr.decode(errors="replace")
             }
+
+    try:
+        # Callers may tighten the limits but never exceed the server maximums
+        queue_timeout = _parse_limit(queue_timeout, "queue_timeout", EXECUTION_QUEUE_TIMEOUT, EXECUTION_QUEUE_TIMEOUT)
+        run_timeout = _parse_limit(run_timeout, "run_timeout", EXECUTION_RUN_TIMEOUT, EXECUTION_RUN_TIMEOUT)
+        memory_limit_mb = _parse_limit(memory_limit_mb, "memory_limit_mb", EXECUTION_MEMORY_LIMIT_MB, EXECUTION_MEMORY_LIMIT_MB)
+        if memory_limit_mb:
+            memory_limit_mb = math.ceil(memory_limit_mb)
+
+        return await scheduler.run(run, client_id, priority, queue_timeout)
     except Exception as e:
         return {
             "error": str(e)
         }
 
 
+@mcp.tool()
+async def scheduler_status() -> Dict:
+    """
+    Get metrics of the execution queue used by execute_cell.
+    
+    Returns:
+        Dict: Running and queued executions, rejections, timeouts and queue wait times
+    """
+    return scheduler.stats()
+
+
 @mcp.tool()
 async def start_lab(port: int = 8888, directory: Optional[str] = None) -> Dict:
     """
@@ -252,6 +515,1039 @@ async def create_notebook(notebook_path: str, cells: Optional[List[str]] = None)
         }
 
 
+def _find_notebooks(path: str) -> List[str]:
+    """
+    Return the notebook files at a path, walking directories recursively.
+    """
+    if os.path.isfile(path):
+        return [path]
+
+    notebooks = []
+    for root, dirs, files in os.walk(path):
+        # Skip checkpoints and blob stores
+        dirs[:] = [d for d in dirs if d not in (".ipynb_checkpoints", BLOB_DIR_NAME)]
+        for name in sorted(files):
+            if name.endswith(".ipynb"):
+                notebooks.append(os.path.join(root, name))
+    return notebooks
+
+
+def _blob_path(blob_dir: str, digest: str) -> str:
+    """
+    Return the path of a blob, sharded by the first two hex digits of its digest.
+    """
+    # Digests come from notebook content, so never let one escape the blob directory
+    if not BLOB_DIGEST_PATTERN.fullmatch(digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return os.path.join(blob_dir, digest[:2], digest)
+
+
+def _write_blob(blob_dir: str, payload: bytes, digest: str) -> bool:
+    """
+    Store a blob unless an identical one already exists.
+
+    Returns:
+        bool: True if the blob was written, False if it was already present
+    """
+    blob_path = _blob_path(blob_dir, digest)
+    if os.path.exists(blob_path):
+        return False
+
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    # Write to a temporary file first so concurrent writers never see a partial blob
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, blob_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+def _output_payloads(output: Dict) -> List[tuple]:
+    """
+    Return (container, key) pairs for the payloads of a notebook output.
+    """
+    if output.get("output_type") == "stream":
+        return [(output, "text")]
+    if output.get("output_type") == "error":
+        return [(output, "traceback")]
+    data = output.get("data") or {}
+    return [(data, mime) for mime in data]
+
+
+def _save_notebook(notebook_path: str, notebook: Dict) -> None:
+    """
+    Atomically replace a notebook file with new content.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(notebook_path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # Keep non-ASCII output readable, as nbformat does
+            json.dump(notebook, f, indent=1, ensure_ascii=False)
+        # mkstemp creates the file as 0600, so keep the notebook's own permissions
+        os.chmod(temp_path, os.stat(notebook_path).st_mode & 0o7777)
+        os.replace(temp_path, notebook_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _compact_file(notebook_path: str, blob_dir: str, min_size: int) -> Dict:
+    """
+    Move the large outputs of a single notebook into the blob store.
+    """
+    try:
+        bytes_before = os.path.getsize(notebook_path)
+        with open(notebook_path, 'r', encoding="utf-8") as f:
+            notebook = json.load(f)
+
+        externalized = 0
+        blobs_written = 0
+        for cell in notebook.get("cells", []):
+            for output in cell.get("outputs", []):
+                for container, key in _output_payloads(output):
+                    value = container[key]
+                    if isinstance(value, str) and value.startswith(BLOB_REF_PREFIX):
+                        continue
+                    payload = json.dumps(value).encode("utf-8")
+                    if len(payload) < min_size:
+                        continue
+                    digest = hashlib.sha256(payload).hexdigest()
+                    if _write_blob(blob_dir, payload, digest):
+                        blobs_written += 1
+                    container[key] = BLOB_REF_PREFIX + digest
+                    externalized += 1
+
+        if externalized:
+            notebook_dir = os.path.dirname(os.path.abspath(notebook_path))
+            notebook.setdefault("metadata", {})["nbblobs"] = {
+                "blob_dir": os.path.relpath(os.path.abspath(blob_dir), notebook_dir)
+            }
+            _save_notebook(notebook_path, notebook)
+
+        return {
+            "notebook": notebook_path,
+            "outputs_externalized": externalized,
+            "blobs_written": blobs_written,
+            "bytes_before": bytes_before,
+            "bytes_after": os.path.getsize(notebook_path)
+        }
+    except Exception as e:
+        return {
+            "notebook": notebook_path,
+            "error": str(e)
+        }
+
+
+def _hydrate_file(notebook_path: str, blob_dir: Optional[str]) -> Dict:
+    """
+    Restore the externalized outputs of a single notebook from the blob store.
+    """
+    try:
+        bytes_before = os.path.getsize(notebook_path)
+        with open(notebook_path, 'r', encoding="utf-8") as f:
+            notebook = json.load(f)
+
+        metadata = notebook.get("metadata", {})
+        if not blob_dir:
+            notebook_dir = os.path.dirname(os.path.abspath(notebook_path))
+            recorded = metadata.get("nbblobs", {}).get("blob_dir", BLOB_DIR_NAME)
+            blob_dir = os.path.join(notebook_dir, recorded)
+
+        restored = 0
+        missing = []
+        invalid = []
+        for cell in notebook.get("cells", []):
+            for output in cell.get("outputs", []):
+                for container, key in _output_payloads(output):
+                    value = container[key]
+                    if not (isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)):
+                        continue
+                    digest = value[len(BLOB_REF_PREFIX):]
+                    if not BLOB_DIGEST_PATTERN.fullmatch(digest):
+                        invalid.append(digest)
+                        continue
+                    blob_path = _blob_path(blob_dir, digest)
+                    if not os.path.exists(blob_path):
+                        missing.append(digest)
+                        continue
+                    with open(blob_path, 'rb') as f:
+                        container[key] = json.loads(f.read().decode("utf-8"))
+                    restored += 1
+
+        # Keep the blob directory reference while any stub is still unresolved
+        dropped_reference = not missing and not invalid and metadata.pop("nbblobs", None) is not None
+        if restored or dropped_reference:
+            _save_notebook(notebook_path, notebook)
+
+        result = {
+            "notebook": notebook_path,
+            "outputs_restored": restored,
+            "bytes_before": bytes_before,
+            "bytes_after": os.path.getsize(notebook_path)
+        }
+        if missing:
+            result["missing_blobs"] = missing
+        if invalid:
+            result["invalid_blobs"] = invalid
+        return result
+    except Exception as e:
+        return {
+            "notebook": notebook_path,
+            "error": str(e)
+        }
+
+
+def _map_notebooks(func, notebooks: List[str], args: tuple, max_workers: Optional[int]) -> List[Dict]:
+    """
+    Apply a per-notebook function, fanning out over a process pool for many files.
+    """
+    if len(notebooks) <= 1:
+        return [func(notebook, *args) for notebook in notebooks]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(notebooks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, notebook, *args) for notebook in notebooks]
+        return [future.result() for future in futures]
+
+
+@mcp.tool()
+async def compact_notebook(
+    path: str,
+    blob_dir: Optional[str] = None,
+    min_size: int = BLOB_MIN_SIZE,
+    max_workers: Optional[int] = None
+) -> Dict:
+    """
+    Move large notebook outputs (plots, long text) into a content-addressed blob store.
+    
+    Each large output is replaced by a small reference stub. Identical outputs are
+    stored once, so notebooks sharing a blob directory are deduplicated.
+    
+    Args:
+        path (str): Path to a notebook, or a directory to compact recursively
+        blob_dir (str, optional): Blob directory. Defaults to .nbblobs next to the notebook,
+            or at the root of the directory being compacted
+        min_size (int, optional): Minimum output size in bytes to externalize. Defaults to 16 KiB.
+        max_workers (int, optional): Number of worker processes for directories.
+            Defaults to the number of CPUs.
+        
+    Returns:
+        Dict: Per-notebook results and total size before and after compaction
+    """
+    try:
+        if not os.path.exists(path):
+            return {
+                "error": f"Path not found: {path}"
+            }
+        notebooks = _find_notebooks(path)
+        if not blob_dir:
+            base_dir = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+            blob_dir = os.path.join(base_dir, BLOB_DIR_NAME)
+
+        results = await asyncio.to_thread(
+            _map_notebooks, _compact_file, notebooks, (blob_dir, min_size), max_workers
+        )
+        succeeded = [r for r in results if "error" not in r]
+
+        return {
+            "blob_dir": blob_dir,
+            "notebooks": results,
+            "outputs_externalized": sum(r["outputs_externalized"] for r in succeeded),
+            "blobs_written": sum(r["blobs_written"] for r in succeeded),
+            "bytes_before": sum(r["bytes_before"] for r in succeeded),
+            "bytes_after": sum(r["bytes_after"] for r in succeeded)
+        }
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
+@mcp.tool()
+async def hydrate_notebook(
+    path: str,
+    blob_dir: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> Dict:
+    """
+    Restore outputs previously moved into the blob store by compact_notebook.
+    
+    Args:
+        path (str): Path to a notebook, or a directory to hydrate recursively
+        blob_dir (str, optional): Blob directory. Defaults to the one recorded in each
+            notebook's metadata during compaction.
+        max_workers (int, optional): Number of worker processes for directories.
+            Defaults to the number of CPUs.
+        
+    Returns:
+        Dict: Per-notebook results, including any blobs that could not be found
+            and stubs with invalid digests
+    """
+    try:
+        if not os.path.exists(path):
+            return {
+                "error": f"Path not found: {path}"
+            }
+        notebooks = _find_notebooks(path)
+        results = await asyncio.to_thread(
+            _map_notebooks, _hydrate_file, notebooks, (blob_dir,), max_workers
+        )
+        succeeded = [r for r in results if "error" not in r]
+
+        return {
+            "notebooks": results,
+            "outputs_restored": sum(r["outputs_restored"] for r in succeeded),
+            "bytes_before": sum(r["bytes_before"] for r in succeeded),
+            "bytes_after": sum(r["bytes_after"] for r in succeeded)
+        }
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
+def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """
+    Kill a subprocess started in its own session, along with any kernel it started.
+    """
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _invalid_parameter_names(parameter_sets: List[Dict]) -> List[str]:
+    """
+    Return the parameter names that cannot be assigned as Python variables.
+    """
+    invalid = []
+    for parameters in parameter_sets:
+        for name in parameters:
+            if not (isinstance(name, str) and name.isidentifier() and not keyword.iskeyword(name)):
+                if name not in invalid:
+                    invalid.append(name)
+    return invalid
+
+
+def _parameters_cell(parameters: Dict) -> Dict:
+    """
+    Build a code cell assigning each parameter as a notebook variable.
+    """
+    lines = ["# Injected parameters"]
+    lines.extend(f"{name} = {value!r}" for name, value in parameters.items())
+    return {
+        "cell_type": "code",
+        "execution_count": None,
+        "metadata": {"tags": ["injected-parameters"]},
+        "source": "\n".join(lines),
+        "outputs": []
+    }
+
+
+def _inject_parameters(notebook: Dict, parameters: Dict) -> Dict:
+    """
+    Return a copy of a notebook with a parameters cell injected.
+    
+    The cell is placed after the cell tagged "parameters" so it overrides the
+    defaults defined there, or at the top of the notebook if there is no such cell.
+    """
+    notebook = json.loads(json.dumps(notebook))
+    cells = notebook.setdefault("cells", [])
+    position = 0
+    for index, cell in enumerate(cells):
+        if "parameters" in cell.get("metadata", {}).get("tags", []):
+            position = index + 1
+            break
+    cells.insert(position, _parameters_cell(parameters))
+    return notebook
+
+
+# Runs in a child process per batch job. The kernel starts in the source notebook's
+# directory so relative data paths resolve, and the notebook is written back even when
+# a cell fails so the partial outputs can be inspected.
+_BATCH_JOB_SCRIPT = '''
+import sys
+import nbformat
+from nbclient import NotebookClient
+
+notebook_path, working_dir, timeout = sys.argv[1], sys.argv[2], int(sys.argv[3])
+notebook = nbformat.read(notebook_path, as_version=4)
+client = NotebookClient(notebook, timeout=timeout, resources={"metadata": {"path": working_dir}})
+try:
+    client.execute()
+finally:
+    nbformat.write(notebook, notebook_path)
+'''
+
+
+async def _run_batch_job(
+    semaphore: asyncio.Semaphore,
+    index: int,
+    parameters: Dict,
+    output_path: str,
+    working_dir: str,
+    timeout: int
+) -> Dict:
+    """
+    Execute one parameterized notebook in its own kernel once a worker slot is free.
+    """
+    async with semaphore:
+        start = time.time()
+        try:
+            cmd = [sys.executable, "-c", _BATCH_JOB_SCRIPT, output_path, working_dir, str(timeout)]
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+            try:
+                _, stderr = await process.communicate()
+            except BaseException:
+                # Don't leave the job and its kernel running if the batch is cancelled
+                _kill_process_group(process)
+                raise
+
+            result = {
+                "job": index,
+                "parameters": parameters,
+                "output_path": output_path,
+                "status": "completed" if process.returncode == 0 else "failed",
+                "duration": round(time.time() - start, 3)
+            }
+            if process.returncode != 0:
+                result["error"] = stderr.decode(errors="replace")
+            return result
+        except Exception as e:
+            return {
+                "job": index,
+                "parameters": parameters,
+                "output_path": output_path,
+                "status": "failed",
+                "duration": round(time.time() - start, 3),
+                "error": str(e)
+            }
+
+
+@mcp.tool()
+async def run_notebook_batch(
+    notebook_path: str,
+    parameter_sets: List[Dict[str, Any]],
+    output_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    timeout: int = 3600,
+    ctx: Context = None
+) -> Dict:
+    """
+    Execute a notebook once per parameter set, running jobs in parallel.
+    
+    Each parameter set is injected as a cell after the cell tagged "parameters"
+    (or at the top of the notebook) and executed in its own kernel, with the
+    notebook's own directory as the working directory so relative paths work.
+    One output notebook is written per job; failed jobs keep the outputs of the
+    cells that ran.
+    
+    Args:
+        notebook_path (str): Path to the notebook to run
+        parameter_sets (List[Dict]): Parameter dicts, one per job
+        output_dir (str, optional): Directory for output notebooks.
+            Defaults to <notebook name>_batch next to the notebook.
+        max_workers (int, optional): Maximum number of jobs running at once.
+            Defaults to the number of CPUs.
+        timeout (int, optional): Per-cell execution timeout in seconds. Defaults to 3600.
+        
+    Returns:
+        Dict: Per-job status, duration and errors, in order of completion
+    """
+    try:
+        invalid = _invalid_parameter_names(parameter_sets)
+        if invalid:
+            return {
+                "error": f"Invalid parameter names: {', '.join(repr(name) for name in invalid)}"
+            }
+
+        with open(notebook_path, 'r') as f:
+            notebook = json.load(f)
+
+        stem = os.path.splitext(os.path.basename(notebook_path))[0]
+        source_dir = os.path.dirname(os.path.abspath(notebook_path))
+        if not output_dir:
+            output_dir = os.path.join(source_dir, f"{stem}_batch")
+        os.makedirs(output_dir, exist_ok=True)
+
+        jobs = []
+        for index, parameters in enumerate(parameter_sets):
+            output_path = os.path.join(output_dir, f"{stem}_{index}.ipynb")
+            with open(output_path, 'w') as f:
+                json.dump(_inject_parameters(notebook, parameters), f, indent=1)
+            jobs.append((index, parameters, output_path))
+
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs) or 1))
+        semaphore = asyncio.Semaphore(workers)
+        start = time.time()
+        tasks = [
+            asyncio.create_task(
+                _run_batch_job(semaphore, index, parameters, output_path, source_dir, timeout)
+            )
+            for index, parameters, output_path in jobs
+        ]
+
+        results = []
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                results.append(result)
+                if ctx:
+                    await ctx.info(f"Job {result['job']} {result['status']} in {result['duration']}s")
+                    await ctx.report_progress(len(results), len(jobs))
+        finally:
+            # Cancel jobs still queued or running so their kernels are killed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {
+            "output_dir": output_dir,
+            "workers": workers,
+            "jobs": results,
+            "completed": sum(1 for r in results if r["status"] == "completed"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "duration": round(time.time() - start, 3)
+        }
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
+def _execute_in_kernel(kernel_id: str, code: str, timeout: int) -> Any:
+    """
+    Run code in a live kernel and return the JSON value it prints after KERNEL_RESULT_MARKER.
+    
+    The kernel is located by id (or a unique prefix of it) through its connection file.
+    """
+    from jupyter_client import BlockingKernelClient, find_connection_file
+
+    client = BlockingKernelClient(connection_file=find_connection_file(kernel_id))
+    client.load_connection_file()
+    client.start_channels()
+    try:
+        client.wait_for_ready(timeout=timeout)
+        stdout = []
+        errors = []
+
+        def collect(msg):
+            content = msg["content"]
+            if msg["msg_type"] == "stream" and content.get("name") == "stdout":
+                stdout.append(content["text"])
+            elif msg["msg_type"] == "error":
+                errors.append(f"{content['ename']}: {content['evalue']}")
+
+        client.execute_interactive(code, store_history=False, timeout=timeout, output_hook=collect)
+    finally:
+        client.stop_channels()
+
+    if errors:
+        raise RuntimeError(errors[0])
+    for line in "".join(stdout).splitlines():
+        if line.startswith(KERNEL_RESULT_MARKER):
+            return json.loads(line[len(KERNEL_RESULT_MARKER):])
+    raise RuntimeError("Kernel did not return a result")
+
+
+def _kernel_call(function_code: str, function_name: str, *args) -> str:
+    """
+    Build kernel code that defines a helper, prints its JSON result and removes it again.
+    """
+    call_args = ", ".join(repr(arg) for arg in args)
+    return (
+        f"{function_code}\n"
+        f"try:\n"
+        f"    print({KERNEL_RESULT_MARKER!r} + __import__('json').dumps({function_name}({call_args})))\n"
+        f"finally:\n"
+        f"    del {function_name}\n"
+    )
+
+
+# Runs inside the kernel. Arrays and DataFrames are written in formats that can be
+# memory-mapped on restore; everything else is pickled.
+_CHECKPOINT_CODE = '''
+def _mcp_checkpoint(path):
+    import json, os, pickle, sys, types, uuid
+    ip = get_ipython()
+    hidden = set(ip.user_ns_hidden)
+    np = sys.modules.get("numpy")
+    pd = sys.modules.get("pandas")
+    os.makedirs(path, exist_ok=True)
+    # Every run writes new files under its own token and only switches the manifest
+    # at the end, so a crash mid-checkpoint leaves the previous checkpoint intact
+    token = uuid.uuid4().hex[:12]
+    variables, skipped = {}, {}
+    for index, (name, value) in enumerate(list(ip.user_ns.items())):
+        if name.startswith("_") or name in hidden:
+            continue
+        if isinstance(value, types.ModuleType):
+            variables[name] = {"kind": "module", "module": value.__name__}
+            continue
+        # Files are named by run token and position, not variable name, so names
+        # differing only in case cannot collide on case-insensitive filesystems
+        stem = os.path.join(path, "%s-%05d" % (token, index))
+        temp = None
+        try:
+            if (np is not None and isinstance(value, np.ndarray)
+                    and not isinstance(value, np.matrix) and not value.dtype.hasobject):
+                file, temp = stem + ".npy", stem + ".npy.tmp"
+                with open(temp, "wb") as f:
+                    np.save(f, value, allow_pickle=False)
+                os.replace(temp, file)
+                variables[name] = {"kind": "numpy", "file": os.path.basename(file)}
+                continue
+            if pd is not None and isinstance(value, pd.DataFrame):
+                try:
+                    import pyarrow as pa
+                    table = pa.Table.from_pandas(value, preserve_index=True)
+                    file, temp = stem + ".arrow", stem + ".arrow.tmp"
+                    with pa.OSFile(temp, "wb") as sink:
+                        with pa.ipc.new_file(sink, table.schema) as writer:
+                            writer.write_table(table)
+                    os.replace(temp, file)
+                    variables[name] = {"kind": "arrow", "file": os.path.basename(file)}
+                    continue
+                except Exception:
+                    # pyarrow missing or unsupported column types
+                    if temp and os.path.exists(temp):
+                        os.remove(temp)
+            file, temp = stem + ".pkl", stem + ".pkl.tmp"
+            with open(temp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, file)
+            variables[name] = {"kind": "pickle", "file": os.path.basename(file)}
+        except Exception as e:
+            if temp and os.path.exists(temp):
+                os.remove(temp)
+            skipped[name] = "%s: %s" % (type(e).__name__, e)
+    manifest_temp = os.path.join(path, "manifest.json.%s.tmp" % token)
+    with open(manifest_temp, "w") as f:
+        json.dump({"variables": variables, "skipped": skipped}, f, indent=1)
+    os.replace(manifest_temp, os.path.join(path, "manifest.json"))
+    # Drop files of earlier runs; arrays still memory-mapped from them stay valid
+    # because unlinking a mapped file is safe on POSIX
+    referenced = {v["file"] for v in variables.values() if "file" in v} | {"manifest.json"}
+    for file in os.listdir(path):
+        if file not in referenced:
+            try:
+                os.remove(os.path.join(path, file))
+            except OSError:
+                pass
+    size = sum(os.path.getsize(os.path.join(path, v["file"])) for v in variables.values() if "file" in v)
+    return {"saved": sorted(variables), "skipped": skipped, "bytes": size}
+'''
+
+# Runs inside the kernel. Arrays are memory-mapped copy-on-write and Arrow files are
+# memory-mapped, so data is only paged in when it is used. Zero-copy DataFrame columns
+# are read-only, so DataFrames restored from Arrow are reported as such.
+_RESTORE_CODE = '''
+def _mcp_restore(path, names):
+    import importlib, json, os, pickle
+    ip = get_ipython()
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    restored, read_only, failed = [], [], {}
+    for name, entry in manifest["variables"].items():
+        if names and name not in names:
+            continue
+        try:
+            kind = entry["kind"]
+            if kind == "module":
+                value = importlib.import_module(entry["module"])
+            elif kind == "numpy":
+                import numpy as np
+                value = np.load(os.path.join(path, entry["file"]), mmap_mode="c")
+            elif kind == "arrow":
+                import pyarrow as pa
+                source = pa.memory_map(os.path.join(path, entry["file"]), "r")
+                value = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+                read_only.append(name)
+            else:
+                with open(os.path.join(path, entry["file"]), "rb") as f:
+                    value = pickle.load(f)
+            ip.user_ns[name] = value
+            restored.append(name)
+        except Exception as e:
+            failed[name] = "%s: %s" % (type(e).__name__, e)
+    return {
+        "restored": sorted(restored),
+        "read_only": sorted(read_only),
+        "failed": failed,
+        "skipped_at_checkpoint": manifest["skipped"]
+    }
+'''
+
+
+def _latest_checkpoint(checkpoint_dir: str) -> Optional[str]:
+    """
+    Return the name of the most recently written checkpoint in a store.
+    """
+    if not os.path.isdir(checkpoint_dir):
+        return None
+    checkpoints = [
+        name for name in os.listdir(checkpoint_dir)
+        if os.path.exists(os.path.join(checkpoint_dir, name, "manifest.json"))
+    ]
+    if not checkpoints:
+        return None
+    return max(checkpoints, key=lambda name: os.path.getmtime(os.path.join(checkpoint_dir, name, "manifest.json")))
+
+
+@mcp.tool()
+async def checkpoint_kernel(
+    kernel_id: str,
+    checkpoint_name: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None,
+    timeout: int = 600
+) -> Dict:
+    """
+    Save the user namespace of a running kernel to the local checkpoint store.
+    
+    numpy arrays are saved as .npy and DataFrames as Arrow IPC files (when pyarrow is
+    installed) so they can be memory-mapped on restore. Other objects are pickled, and
+    objects that cannot be pickled are skipped and reported.
+    
+    Args:
+        kernel_id (str): Id of the kernel, or a unique prefix of it
+        checkpoint_name (str, optional): Name of the checkpoint. Defaults to a timestamp
+            with a unique suffix.
+        checkpoint_dir (str, optional): Checkpoint store. Defaults to ~/.jupyter_mcp/checkpoints
+        timeout (int, optional): Timeout in seconds. Defaults to 600.
+        
+    Returns:
+        Dict: Saved variables, skipped variables with reasons and checkpoint size
+    """
+    try:
+        checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+        checkpoint_name = checkpoint_name or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.abspath(os.path.join(checkpoint_dir, checkpoint_name))
+
+        code = _kernel_call(_CHECKPOINT_CODE, "_mcp_checkpoint", path)
+        result = await asyncio.to_thread(_execute_in_kernel, kernel_id, code, timeout)
+
+        return {
+            "checkpoint": checkpoint_name,
+            "path": path,
+            **result
+        }
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
+@mcp.tool()
+async def restore_kernel(
+    kernel_id: str,
+    checkpoint_name: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None,
+    variables: Optional[List[str]] = None,
+    timeout: int = 600
+) -> Dict:
+    """
+    Restore a checkpoint saved by checkpoint_kernel into a running kernel.
+    
+    Arrays and DataFrames are memory-mapped rather than read in full, so restoring
+    large checkpoints is fast and data is only loaded as it is used. Arrays are
+    copy-on-write. DataFrames restored from Arrow share read-only memory and are
+    listed under read_only; call .copy() on them before modifying them in place.
+    
+    Args:
+        kernel_id (str): Id of the kernel, or a unique prefix of it
+        checkpoint_name (str, optional): Checkpoint to restore. Defaults to the latest one.
+        checkpoint_dir (str, optional): Checkpoint store. Defaults to ~/.jupyter_mcp/checkpoints
+        variables (List[str], optional): Only restore these variables
+        timeout (int, optional): Timeout in seconds. Defaults to 600.
+        
+    Returns:
+        Dict: Restored variables, read-only DataFrames and variables that failed to load
+    """
+    try:
+        checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+        checkpoint_name = checkpoint_name or _latest_checkpoint(checkpoint_dir)
+        if not checkpoint_name:
+            return {
+                "error": f"No checkpoints found in {checkpoint_dir}"
+            }
+        path = os.path.abspath(os.path.join(checkpoint_dir, checkpoint_name))
+
+        code = _kernel_call(_RESTORE_CODE, "_mcp_restore", path, variables)
+        result = await asyncio.to_thread(_execute_in_kernel, kernel_id, code, timeout)
+
+        return {
+            "checkpoint": checkpoint_name,
+            "path": path,
+            **result
+        }
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
+# Runs inside the kernel. Every summary is built from metadata and a bounded sample
+# so large objects are never materialized; SIGALRM enforces the per-variable budget.
+_INSPECT_CODE = '''
+def _mcp_inspect(names, changed_only, sample_size, time_budget, max_bytes):
+    import hashlib, json, reprlib, signal, sys, types
+    ip = get_ipython()
+    hidden = set(ip.user_ns_hidden)
+    np = sys.modules.get("numpy")
+    pd = sys.modules.get("pandas")
+    short = reprlib.Repr()
+    short.maxstring = short.maxother = 200
+    short.maxlist = short.maxtuple = short.maxset = short.maxdict = sample_size
+    # Objects up to these sizes are hashed in full; larger ones are sampled
+    full_bytes = 4 * 1024 * 1024
+    full_items = 10000
+    full_cells = 250000
+    # Samples of larger objects look at a bounded part of the content
+    probe_size = 64
+    probe = reprlib.Repr()
+    probe.maxstring = probe.maxother = 1000
+    probe.maxlist = probe.maxtuple = probe.maxset = probe.maxfrozenset = probe.maxdict = probe_size
+
+    # BaseException so that reprlib, which swallows Exception from __repr__, cannot hide it
+    class BudgetExceeded(BaseException):
+        pass
+
+    class TooLarge(Exception):
+        pass
+
+    def on_alarm(signum, frame):
+        raise BudgetExceeded()
+
+    def hash_full(digest, value, budget):
+        # Hash the whole content, raising TooLarge once the object exceeds the limits
+        budget[0] -= 1
+        if budget[0] < 0:
+            raise TooLarge()
+        digest.update(type(value).__name__.encode())
+        if np is not None and isinstance(value, np.ndarray):
+            if value.dtype.hasobject:
+                if value.size > budget[0]:
+                    raise TooLarge()
+                hash_full(digest, value.tolist(), budget)
+            elif value.nbytes > full_bytes:
+                raise TooLarge()
+            else:
+                digest.update(np.ascontiguousarray(value).tobytes())
+        elif pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+            if value.size > full_cells:
+                raise TooLarge()
+            if isinstance(value, pd.DataFrame):
+                digest.update(repr(list(value.dtypes.items())).encode())
+            try:
+                digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+            except TypeError:
+                # Unhashable cell values such as lists
+                hash_full(digest, value.index.tolist(), budget)
+                hash_full(digest, value.values.tolist(), budget)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                hash_full(digest, key, budget)
+                hash_full(digest, item, budget)
+        elif isinstance(value, (list, tuple)):
+            digest.update(str(len(value)).encode())
+            for item in value:
+                hash_full(digest, item, budget)
+        elif isinstance(value, (set, frozenset)):
+            budget[0] -= len(value)
+            if budget[0] < 0:
+                raise TooLarge()
+            for item in sorted(repr(item) for item in value):
+                digest.update(item.encode())
+        elif isinstance(value, (str, bytes)):
+            if len(value) > full_bytes:
+                raise TooLarge()
+            digest.update(value.encode("utf-8", "surrogatepass") if isinstance(value, str) else value)
+        elif isinstance(value, (int, float, complex, bool, type(None))):
+            digest.update(repr(value).encode())
+        elif callable(value) or isinstance(value, type):
+            digest.update(repr(getattr(value, "__qualname__", "")).encode())
+        elif isinstance(getattr(value, "__dict__", None), dict):
+            hash_full(digest, value.__dict__, budget)
+        else:
+            digest.update(probe.repr(value).encode())
+
+    def hash_sample(digest, value):
+        # Heuristic for large objects: changes outside the sample can be missed
+        if np is not None and isinstance(value, np.ndarray):
+            if value.size and not value.dtype.hasobject:
+                # Head, tail and an evenly strided sample of about probe_size elements
+                step = max(1, value.size // probe_size)
+                for sample in (value.flat[:probe_size], value.flat[-probe_size:], value.flat[::step]):
+                    digest.update(np.ascontiguousarray(sample).tobytes())
+            elif value.size:
+                digest.update(probe.repr(value.flat[:probe_size].tolist()).encode())
+        elif pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+            if isinstance(value, pd.DataFrame):
+                digest.update(repr(list(value.dtypes.items())[:probe_size]).encode())
+            step = max(1, len(value) // probe_size)
+            for rows in (value.head(probe_size), value.tail(probe_size), value.iloc[::step]):
+                try:
+                    digest.update(pd.util.hash_pandas_object(rows, index=True).values.tobytes())
+                except TypeError:
+                    digest.update(probe.repr(rows.values.tolist()).encode())
+        elif not callable(value) and not isinstance(value, (str, bytes, list, tuple, dict, set, frozenset)) \
+                and isinstance(getattr(value, "__dict__", None), dict):
+            digest.update(probe.repr(value.__dict__).encode())
+        else:
+            digest.update(probe.repr(value).encode())
+
+    def fingerprint(value):
+        # Identity and metadata plus a content hash, so in-place mutations are detected.
+        # Small objects are hashed in full and large ones from a bounded sample.
+        parts = [type(value).__name__, id(value)]
+        for attr in ("shape", "dtype"):
+            parts.append(str(getattr(value, attr, "")))
+        try:
+            parts.append(len(value))
+        except Exception:
+            pass
+        try:
+            digest = hashlib.sha1(repr(parts).encode())
+            hash_full(digest, value, [full_items])
+        except (TooLarge, RecursionError):
+            digest = hashlib.sha1(repr(parts + ["sampled"]).encode())
+            hash_sample(digest, value)
+        return digest.hexdigest()
+
+    def summarize(value):
+        info = {"type": type(value).__module__ + "." + type(value).__qualname__}
+        if np is not None and isinstance(value, np.ndarray):
+            info.update(shape=list(value.shape), dtype=str(value.dtype), memory=int(value.nbytes))
+            info["head"] = short.repr(value.flat[:sample_size].tolist())
+        elif pd is not None and isinstance(value, pd.DataFrame):
+            info.update(shape=list(value.shape), memory=int(value.memory_usage(index=True, deep=False).sum()))
+            info["dtypes"] = {str(c): str(t) for c, t in list(value.dtypes.items())[:50]}
+            info["head"] = value.head(sample_size).to_string(max_cols=20, max_colwidth=50)[:2000]
+        elif pd is not None and isinstance(value, pd.Series):
+            info.update(shape=list(value.shape), dtype=str(value.dtype), memory=int(value.memory_usage(index=True, deep=False)))
+            info["head"] = value.head(sample_size).to_string(max_rows=sample_size)[:2000]
+        else:
+            info["memory"] = sys.getsizeof(value)
+            if isinstance(value, (list, tuple, dict, set, frozenset, str, bytes)):
+                info["length"] = len(value)
+            if not callable(value):
+                info["repr"] = short.repr(value)
+        return info
+
+    state = ip.user_ns.setdefault("_mcp_inspect_state", {})
+    current = {
+        name: value for name, value in ip.user_ns.items()
+        if not name.startswith("_") and name not in hidden and not isinstance(value, types.ModuleType)
+        and (not names or name in names)
+    }
+    variables, truncated = {}, []
+    size = 0
+    use_alarm = hasattr(signal, "setitimer")
+    previous = signal.signal(signal.SIGALRM, on_alarm) if use_alarm else None
+    try:
+        for name, value in current.items():
+            # None when the fingerprint itself runs out of time; such variables are
+            # always treated as changed
+            current_fingerprint = None
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, time_budget)
+                try:
+                    current_fingerprint = fingerprint(value)
+                    if changed_only and current_fingerprint == state.get(name):
+                        continue
+                    if size >= max_bytes:
+                        truncated.append(name)
+                        continue
+                    info = summarize(value)
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+            except BudgetExceeded:
+                info = {"type": type(value).__name__, "error": "time budget exceeded"}
+            except Exception as e:
+                info = {"type": type(value).__name__, "error": "%s: %s" % (type(e).__name__, e)}
+            size += len(json.dumps(info, default=str))
+            variables[name] = info
+            # Only remember what was actually returned, so truncated variables show up later
+            if current_fingerprint is None:
+                state.pop(name, None)
+            else:
+                state[name] = current_fingerprint
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+    removed = [name for name in state if name not in ip.user_ns]
+    for name in removed:
+        del state[name]
+    return {"variables": variables, "removed": removed, "truncated": truncated}
+'''
+
+
+@mcp.tool()
+async def inspect_variables(
+    kernel_id: str,
+    names: Optional[List[str]] = None,
+    changed_only: bool = False,
+    sample_size: int = 5,
+    time_budget: float = 0.5,
+    max_bytes: int = 65536,
+    timeout: int = 60
+) -> Dict:
+    """
+    Summarize the user variables of a running kernel without printing them.
+    
+    Each summary contains the type, shape, dtype, memory footprint and a small
+    head/sample for arrays and DataFrames. Summaries never copy or render whole
+    objects, each one is limited to a time budget, and the response stops growing
+    once it reaches max_bytes.
+    
+    Changes are tracked by fingerprinting each variable's content. Objects up to a
+    few MB (or ten thousand items) are hashed in full; changes to larger objects
+    are detected heuristically from a sample and can be missed.
+    
+    Args:
+        kernel_id (str): Id of the kernel, or a unique prefix of it
+        names (List[str], optional): Only inspect these variables
+        changed_only (bool, optional): Only return variables that changed since the last call.
+            Defaults to False.
+        sample_size (int, optional): Number of rows/items in samples. Defaults to 5.
+        time_budget (float, optional): Seconds allowed per variable summary. Defaults to 0.5.
+        max_bytes (int, optional): Approximate size limit of the response. Defaults to 64 KiB.
+        timeout (int, optional): Timeout in seconds. Defaults to 60.
+        
+    Returns:
+        Dict: Variable summaries, variables deleted since the last call and
+            variables left out because of the size limit
+    """
+    try:
+        code = _kernel_call(
+            _INSPECT_CODE, "_mcp_inspect",
+            names, changed_only, sample_size, time_budget, max_bytes
+        )
+        return await asyncio.to_thread(_execute_in_kernel, kernel_id, code, timeout)
+    except Exception as e:
+        return {
+            "error": str(e)
+        }
+
+
 @mcp.resource("http://jupyter/info")
 def get_jupyter_info() -> Dict:
     """
@@ -0,0 +1,194 @@
+/**
+ * Bounded run queue for Python executions with priority levels and per-client fair sharing
+ */
+const os = require('os');
+
+const PRIORITIES = ['high', 'normal', 'low'];
+
+/**
+ * Error raised when an execution is rejected or times out in the queue
+ */
+class SchedulerError extends Error {
+  constructor(message, code) {
+    super(message);
+    this.name = 'SchedulerError';
+    this.code = code;
+  }
+}
+
+class ExecutionScheduler {
+  /**
+   * @param {Object} options - Scheduler options
+   * @param {number} options.maxRunning - Maximum number of executions running at once
+   * @param {number} options.maxQueued - Maximum number of waiting executions
+   */
+  constructor(options = {}) {
+    const {
+      maxRunning = os.cpus().length || 1,
+      maxQueued = 64
+    } = options;
+
+    this.maxRunning = maxRunning;
+    this.maxQueued = maxQueued;
+    this.running = 0;
+    this.queued = 0;
+    this.completed = 0;
+    this.rejected = 0;
+    this.timedOut = 0;
+    // priority -> client id -> waiting entries; Map keeps clients in round-robin order
+    this.queues = new Map(PRIORITIES.map(priority => [priority, new Map()]));
+    this.waitTimes = [];
+  }
+
+  /**
+   * Wait for a slot, then run a task and resolve with its result
+   * @param {Function} task - Function returning a promise
+   * @param {Object} options - Scheduling options
+   * @param {string} options.clientId - Caller identity used for fair sharing
+   * @param {string} options.priority - 'high', 'normal' or 'low'
+   * @param {number} options.queueTimeoutMs - Maximum time to wait for a slot
+   * @returns {Promise<*>} - Result of the task
+   */
+  run(task, options = {}) {
+    const {
+      clientId = 'default',
+      priority = 'normal',
+      queueTimeoutMs = 300000
+    } = options;
+
+    if (!this.queues.has(priority)) {
+      return Promise.reject(new SchedulerError(
+        `Unknown priority '${priority}', expected one of ${PRIORITIES.join(', ')}`,
+        'INVALID_PRIORITY'
+      ));
+    }
+    if (this.queued >= this.maxQueued) {
+      this.rejected++;
+      return Promise.reject(new SchedulerError(
+        `Execution queue is full (${this.queued} waiting)`,
+        'QUEUE_FULL'
+      ));
+    }
+
+    return new Promise((resolve, reject) => {
+      const entry = { enqueuedAt: Date.now(), timer: null, start: null };
+
+      entry.start = () => {
+        clearTimeout(entry.timer);
+        Promise.resolve()
+          .then(task)
+          .then(resolve, reject)
+          .finally(() => {
+            this.completed++;
+            this.running--;
+            this.dispatch();
+          });
+      };
+
+      if (queueTimeoutMs) {
+        entry.timer = setTimeout(() => {
+          this.remove(priority, clientId, entry);
+          this.timedOut++;
+          reject(new SchedulerError(
+            `Execution waited more than ${queueTimeoutMs}ms in the queue`,
+            'QUEUE_TIMEOUT'
+          ));
+        }, queueTimeoutMs);
+      }
+
+      const clients = this.queues.get(priority);
+      if (!clients.has(clientId)) {
+        clients.set(clientId, []);
+      }
+      clients.get(clientId).push(entry);
+      this.queued++;
+      this.dispatch();
+    });
+  }
+
+  /**
+   * Get queue depth, utilization and wait-time metrics
+   * @returns {Object} - Scheduler metrics
+   */
+  stats() {
+    const waits = [...this.waitTimes].sort((a, b) => a - b);
+    const queuedByPriority = {};
+    for (const [priority, clients] of this.queues) {
+      queuedByPriority[priority] = Array.from(clients.values())
+        .reduce((total, entries) => total + entries.length, 0);
+    }
+
+    return {
+      running: this.running,
+      queued: this.queued,
+      queuedByPriority,
+      maxRunning: this.maxRunning,
+      maxQueued: this.maxQueued,
+      completed: this.completed,
+      rejected: this.rejected,
+      timedOut: this.timedOut,
+      waitTimeAvgMs: waits.length ? Math.round(waits.reduce((a, b) => a + b, 0) / waits.length) : 0,
+      waitTimeP95Ms: waits.length ? waits[Math.min(waits.length - 1, Math.floor(waits.length * 0.95))] : 0,
+      waitTimeMaxMs: waits.length ? waits[waits.length - 1] : 0
+    };
+  }
+
+  remove(priority, clientId, entry) {
+    const clients = this.queues.get(priority);
+    const entries = clients.get(clientId);
+    const index = entries ? entries.indexOf(entry) : -1;
+    if (index !== -1) {
+      entries.splice(index, 1);
+      this.queued--;
+      if (entries.length === 0) {
+        clients.delete(clientId);
+      }
+    }
+  }
+
+  dispatch() {
+    while (this.running < this.maxRunning) {
+      const entry = this.nextEntry();
+      if (!entry) {
+        return;
+      }
+      this.running++;
+      this.waitTimes.push(Date.now() - entry.enqueuedAt);
+      if (this.waitTimes.length > 1000) {
+        this.waitTimes.shift();
+      }
+      entry.start();
+    }
+  }
+
+  nextEntry() {
+    for (const clients of this.queues.values()) {
+      if (clients.size === 0) {
+        continue;
+      }
+      // Take from the client at the front, then send it to the back of the line
+      const [clientId, entries] = clients.entries().next().value;
+      const entry = entries.shift();
+      this.queued--;
+      clients.delete(clientId);
+      if (entries.length > 0) {
+        clients.set(clientId, entries);
+      }
+      return entry;
+    }
+    return null;
+  }
+}
+
+// Create a singleton instance shared by all execution paths
+const executionScheduler = new ExecutionScheduler({
+  maxRunning: parseInt(process.env.EXECUTION_MAX_RUNNING, 10) || os.cpus().length || 1,
+  maxQueued: parseInt(process.env.EXECUTION_MAX_QUEUED, 10) || 64
+});
+
+module.exports = {
+  executionScheduler,
+  ExecutionScheduler,
+  SchedulerError,
+  PRIORITIES
+};
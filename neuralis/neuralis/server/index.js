@@ -6,6 +6,7 @@ const bodyParser = require('body-parser');
 const cors = require('cors');
 const { sendMessageToAmazonQ } = require('./amazonQService');
 const { executePythonCode, createSession, closeSession, listSessions } = require('./pythonService');
+const { executionScheduler, SchedulerError } = require('./executionScheduler');
 const {
   checkDockerAvailability,
   buildKernelContainer,
@@ -44,20 +45,42 @@ app.post('/api/amazon-q', async (req, res) => {
 // API endpoints for Python execution
 app.post('/api/python/execute', async (req, res) => {
   try {
-    const { code, sessionId } = req.body;
+    const { code, sessionId, clientId, priority, queueTimeoutMs, runTimeoutMs, memoryLimitMb } = req.body;
     
     if (!code) {
       return res.status(400).json({ error: 'Code is required' });
     }
     
-    const result = await executePythonCode(code, sessionId || 'default');
+    const result = await executePythonCode(code, sessionId || 'default', {
+      clientId: clientId || req.ip,
+      priority,
+      queueTimeoutMs,
+      runTimeoutMs,
+      memoryLimitMb
+    });
     res.json(result);
   } catch (error) {
+    if (error instanceof SchedulerError) {
+      // Tell the client to back off instead of piling more work onto the host
+      const status = error.code === 'INVALID_PRIORITY' || error.code === 'INVALID_OPTION'
+        ? 400
+        : error.code === 'QUEUE_FULL' ? 429 : 503;
+      return res.status(status).json({ error: error.message, code: error.code });
+    }
     console.error('Error executing Python code:', error);
     res.status(500).json({ error: error.message });
   }
 });
 
+app.get('/api/python/scheduler', (req, res) => {
+  try {
+    res.json(executionScheduler.stats());
+  } catch (error) {
+    console.error('Error getting scheduler stats:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
 app.post('/api/python/session', (req, res) => {
   try {
     const { config } = req.body;
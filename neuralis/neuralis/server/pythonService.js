@@ -6,23 +6,89 @@ const { v4: uuidv4 } = require('uuid');
 const fs = require('fs');
 const path = require('path');
 const os = require('os');
+const { executionScheduler, SchedulerError } = require('./executionScheduler');
+
+// Largest delay setTimeout supports; longer ones fire immediately
+const MAX_TIMER_MS = 2147483647;
+
+// Default per-execution limits, which are also the most a client may request
+const DEFAULT_QUEUE_TIMEOUT_MS = Math.min(parseInt(process.env.EXECUTION_QUEUE_TIMEOUT_MS, 10) || 300000, MAX_TIMER_MS);
+const DEFAULT_RUN_TIMEOUT_MS = Math.min(parseInt(process.env.EXECUTION_RUN_TIMEOUT_MS, 10) || 600000, MAX_TIMER_MS);
+const DEFAULT_MEMORY_LIMIT_MB = parseInt(process.env.EXECUTION_MEMORY_LIMIT_MB, 10) || 0;
 
 // Store active kernel sessions
 const activeSessions = new Map();
 
+/**
+ * Validate a client-supplied limit and clamp it to the server maximum
+ * @param {*} value - Requested value (undefined or null for the default)
+ * @param {string} name - Option name used in error messages
+ * @param {number} defaultValue - Value used when none is requested
+ * @param {number} maxValue - Largest allowed value (0 for no maximum)
+ * @returns {number} - Validated limit
+ */
+const parseLimit = (value, name, defaultValue, maxValue) => {
+  if (value === undefined || value === null) {
+    return defaultValue;
+  }
+
+  const number = Number(value);
+  if (typeof value === 'boolean' || !Number.isFinite(number) || number <= 0) {
+    throw new SchedulerError(`${name} must be a positive number`, 'INVALID_OPTION');
+  }
+
+  const limit = Math.ceil(number);
+  return maxValue > 0 ? Math.min(limit, maxValue) : limit;
+};
+
+/**
+ * Queue Python code for execution through the shared execution scheduler
+ * @param {string} code - Python code to execute
+ * @param {string} sessionId - Session ID for the kernel
+ * @param {Object} options - Scheduling options
+ * @param {string} options.clientId - Caller identity for fair sharing (defaults to the session)
+ * @param {string} options.priority - 'high', 'normal' or 'low'
+ * @param {number} options.queueTimeoutMs - Maximum time to wait in the queue
+ * @param {number} options.runTimeoutMs - Maximum run time, also used as the CPU time limit
+ * @param {number} options.memoryLimitMb - Address space limit (defaults to the server limit)
+ * @returns {Promise<Object>} - Execution result
+ */
+const executePythonCode = (code, sessionId, options = {}) => {
+  const { clientId = sessionId, priority = 'normal' } = options;
+
+  let queueTimeoutMs;
+  let runTimeoutMs;
+  let memoryLimitMb;
+  try {
+    // Clients may tighten the limits but never exceed the server defaults
+    queueTimeoutMs = parseLimit(options.queueTimeoutMs, 'queueTimeoutMs', DEFAULT_QUEUE_TIMEOUT_MS, DEFAULT_QUEUE_TIMEOUT_MS);
+    runTimeoutMs = parseLimit(options.runTimeoutMs, 'runTimeoutMs', DEFAULT_RUN_TIMEOUT_MS, DEFAULT_RUN_TIMEOUT_MS);
+    memoryLimitMb = parseLimit(options.memoryLimitMb, 'memoryLimitMb', DEFAULT_MEMORY_LIMIT_MB, DEFAULT_MEMORY_LIMIT_MB);
+  } catch (error) {
+    return Promise.reject(error);
+  }
+
+  return executionScheduler.run(
+    () => runPythonCode(code, sessionId, { runTimeoutMs, memoryLimitMb }),
+    { clientId, priority, queueTimeoutMs }
+  );
+};
+
 /**
  * Create a temporary Python file and execute it
  * @param {string} code - Python code to execute
  * @param {string} sessionId - Session ID for the kernel
+ * @param {Object} limits - Run time and memory limits
  * @returns {Promise<Object>} - Execution result
  */
-const executePythonCode = async (code, sessionId) => {
+const runPythonCode = async (code, sessionId, limits) => {
+  const { runTimeoutMs, memoryLimitMb } = limits;
   try {
     // Create or get session directory
     const sessionDir = getSessionDir(sessionId);
     
     // Create a unique filename for this execution
-    const filename = `execution_${Date.now()}.py`;
+    const filename = `execution_${uuidv4()}.py`;
     const filePath = path.join(sessionDir, filename);
     
     // Add code to handle image output
@@ -33,6 +99,15 @@ import base64
 import io
 from contextlib import redirect_stdout, redirect_stderr
 
+# Apply CPU and memory limits for this execution
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (${Math.ceil(runTimeoutMs / 1000)}, ${Math.ceil(runTimeoutMs / 1000)}))
+    if ${memoryLimitMb} > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (${memoryLimitMb} * 1024 * 1024, ${memoryLimitMb} * 1024 * 1024))
+except (ImportError, ValueError, OSError):
+    pass
+
 # Setup for capturing matplotlib output
 try:
     import matplotlib
@@ -90,6 +165,13 @@ print(stderr_buffer.getvalue(), file=sys.stderr, end='')
       let stdout = '';
       let stderr = '';
       let imageData = null;
+      let timedOut = false;
+      
+      // Kill the process once it exceeds its run time
+      const timer = setTimeout(() => {
+        timedOut = true;
+        pythonProcess.kill('SIGKILL');
+      }, runTimeoutMs);
       
       // Collect stdout
       pythonProcess.stdout.on('data', (data) => {
@@ -112,7 +194,14 @@ print(stderr_buffer.getvalue(), file=sys.stderr, end='')
       
       // Handle process completion
       pythonProcess.on('close', (code) => {
-        if (code !== 0) {
+        clearTimeout(timer);
+        if (timedOut) {
+          resolve({
+            type: 'error',
+            content: `Execution exceeded ${runTimeoutMs}ms`,
+            exitCode: code
+          });
+        } else if (code !== 0) {
           resolve({
             type: 'error',
             content: stderr,
@@ -130,6 +219,7 @@ print(stderr_buffer.getvalue(), file=sys.stderr, end='')
       
       // Handle process errors
       pythonProcess.on('error', (error) => {
+        clearTimeout(timer);
         reject({
           type: 'error',
           content: `Failed to start Python process: ${error.message}`,